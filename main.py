@@ -1,9 +1,16 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-import requests
-from collections import Counter
+import numpy as np
+import orjson
+import io
+import importlib.util
+import os
+import time
+import pyarrow as pa
+import pyarrow.parquet as pq
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlsplit
 
 # Page configuration
 st.set_page_config(
@@ -46,120 +53,613 @@ API_ENDPOINTS = {
     "Kimono & Gilet": "https://unforus.net/UNIQ/reporting-apis/api_kimono_gilet_inventory_count.php"
 }
 
-# Function to fetch data from API
+# Label columns the inventory can be grouped by
+GROUP_COLUMNS = ("gender", "collection", "fit", "color", "un_size", "un_waist")
 
+# Largest heatmap that still gets a text label drawn in every cell
+HEATMAP_TEXT_CELLS = 200
 
-@st.cache_data(ttl=600)  # Cache data for 10 minutes
-def fetch_inventory_data(api_url):
-    """Fetch inventory data from the API"""
+# Rows of the raw data table sent to the browser per "Show more rows" click
+RAW_DATA_PAGE_ROWS = 500
+
+# Seconds downloaded inventory data is used before it is fetched again
+INVENTORY_TTL = 600
+
+# Seconds after which a background refresh of the 10 minute API cache starts
+PREFETCH_AFTER = 540
+
+# Seconds after which a failed API request is tried again
+RETRY_AFTER = 30
+
+# Directory holding the last API response of each category between restarts
+CACHE_DIR = Path.home() / ".cache" / "uniq"
+
+# Rows above which the cube is summed by Numba's parallel kernel, if the
+# optional numba package is installed (see requirements.txt)
+NUMBA_MIN_ROWS = 50_000
+NUMBA_ENGINE_KWARGS = {"parallel": True, "nogil": True}
+
+# Functions to fetch data from API
+
+
+@st.cache_resource
+def http_session():
+    """Keep-alive HTTP session reused for every API request"""
+    # Imported on the first request, so a start served from disk skips it
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    # requests already asks for gzip/deflate; also say JSON is expected
+    session.headers["Accept"] = "application/json"
+    # One pooled connection per background worker, so parallel requests
+    # to the API host each keep their connection alive
+    adapter = HTTPAdapter(pool_connections=len(API_ENDPOINTS),
+                          pool_maxsize=len(API_ENDPOINTS))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+@st.cache_resource
+def background_requests():
+    """Worker threads and the API requests started on them, keyed by URL"""
+    return ThreadPoolExecutor(max_workers=len(API_ENDPOINTS)), {}
+
+
+def inventory_cache_path(api_url):
+    """Parquet file that keeps a copy of api_url's data across restarts"""
+    return CACHE_DIR / f"{Path(urlsplit(api_url).path).stem}.parquet"
+
+
+def inventory_cache_age(path):
+    """Seconds since the saved copy was last confirmed current"""
+    try:
+        return time.time() - path.stat().st_mtime
+    except OSError:
+        return float("inf")
+
+
+def saved_etag(path):
+    """ETag the API sent with the saved copy, if there is one"""
+    try:
+        etag = (pq.read_schema(path).metadata or {}).get(b"etag")
+    except (OSError, pa.ArrowException):
+        return None
+    return etag.decode() if etag else None
+
+
+def saved_version(path):
+    """Version of the saved copy: its ETag, or the time it was written"""
+    return saved_etag(path) or str(path.stat().st_mtime)
+
+
+def save_inventory(path, df, etag):
+    """Write the parsed frame and its ETag next to each other on disk"""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if etag:
+        table = table.replace_schema_metadata(
+            {**table.schema.metadata, b"etag": etag.encode()})
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write aside and rename, so readers never see a partial file
+        partial = path.with_suffix(".partial")
+        pq.write_table(table, partial, compression="zstd")
+        partial.replace(path)
+    except OSError:
+        pass  # The disk copy only saves a request; the app works without it
+
+
+def inventory_frame(records):
+    """Build the typed inventory frame column by column from API records"""
+    present = set().union(*records)
+    columns = {}
+    # Keep only the columns the dashboard uses
+    for column in (*GROUP_COLUMNS, "unique_ean_count"):
+        if column not in present:
+            continue
+        values = [record.get(column) for record in records]
+        if column == "unique_ean_count":
+            try:
+                # NumPy would truncate float counts instead of failing
+                if float in set(map(type, values)):
+                    raise ValueError("fractional counts")
+                counts = np.array(values, dtype=np.int64)
+            except (TypeError, ValueError):
+                # Missing or fractional counts need pandas' full parser
+                counts = pd.to_numeric(pd.Series(values)).to_numpy()
+            # Store in the narrowest unsigned integer; sums are still
+            # accumulated in 64 bits
+            columns[column] = pd.to_numeric(counts, downcast="unsigned")
+        else:
+            # Every label as a category of strings, so filters and groupbys
+            # work on integer codes and compare against the selectbox text
+            columns[column] = pd.Categorical(
+                [None if value is None else str(value) for value in values])
+    return pd.DataFrame(columns)
+
+
+def request_inventory(session, api_url, etag=None):
+    """Download and parse an API payload; safe to run off the script thread.
+    Returns the response ETag and the payload, or None if not modified"""
+    headers = {"If-None-Match": etag} if etag else None
+    # Give up on connecting after 3 seconds and on a stalled read after 10
+    response = session.get(api_url, headers=headers, timeout=(3, 10))
+    response.raise_for_status()  # Raise exception for HTTP errors
+    if response.status_code == 304:
+        return etag, None
+    return response.headers.get("ETag"), orjson.loads(response.content)
+
+
+def prefetch_inventory_data(api_url):
+    """Start downloading api_url in the background unless a recent request
+    is already under way, so the cache refresh rarely has to wait"""
+    pool, started = background_requests()
+    submitted_at, future = started.get(api_url, (None, None))
+    now = time.monotonic()
+    path = inventory_cache_path(api_url)
+    # A request that failed is started again rather than waited out
+    failed = (future is not None and future.done()
+              and future.exception() is not None)
+    if ((submitted_at is None or now - submitted_at > PREFETCH_AFTER
+         or failed and now - submitted_at > RETRY_AFTER)
+            and inventory_cache_age(path) > PREFETCH_AFTER):
+        started[api_url] = (now, pool.submit(
+            request_inventory, http_session(), api_url, saved_etag(path)))
+
+
+# The two full-size frames are shared rather than unpickled on every rerun;
+# nothing below modifies them in place
+@st.cache_resource(ttl=INVENTORY_TTL)
+def load_inventory_data(api_url):
+    """Fetch inventory data from the API, or from disk if still current.
+    Returns when the data was last confirmed current, a version that
+    changes only with the data, the frame and, if it failed, why"""
+    path = inventory_cache_path(api_url)
     try:
-        response = requests.get(api_url)
-        response.raise_for_status()  # Raise exception for HTTP errors
-        data = response.json()
+        # A copy saved or revalidated in the last 10 minutes needs no request
+        age = inventory_cache_age(path)
+        if age < INVENTORY_TTL:
+            return (time.time() - age, saved_version(path),
+                    pd.read_parquet(path), None)
+        # Use the background request if it is younger than the cache
+        started = background_requests()[1]
+        submitted_at, future = started.get(api_url, (None, None))
+        prefetched = None
+        if (future is not None
+                and time.monotonic() - submitted_at < INVENTORY_TTL):
+            try:
+                prefetched = future.result()
+            except Exception:
+                # Drop a failed prefetch and request the data right here,
+                # as if there had been none
+                if started.get(api_url, (None, None))[1] is future:
+                    started.pop(api_url, None)
+        if prefetched is not None:
+            confirmed_at = time.time() - (time.monotonic() - submitted_at)
+            etag, data = prefetched
+        else:
+            confirmed_at = time.time()
+            etag, data = request_inventory(
+                http_session(), api_url, saved_etag(path))
+        if data is None:
+            # Not modified: the saved copy is as current as the request
+            os.utime(path, (confirmed_at, confirmed_at))
+            return confirmed_at, etag, pd.read_parquet(path), None
         if data["status"] == "success":
-            return pd.DataFrame(data["data"])
+            df = inventory_frame(data["data"])
+            if not df.empty:
+                save_inventory(path, df, etag)
+            return confirmed_at, etag or str(confirmed_at), df, None
         else:
-            st.error(f"API returned error status: {data['status']}")
-            return pd.DataFrame()
+            return (time.time(), None, pd.DataFrame(),
+                    f"API returned error status: {data['status']}")
     except Exception as e:
-        st.error(f"Error fetching data: {e}")
+        # Returned rather than shown with st.error: every cached function
+        # calling this one would record the message and replay it even
+        # after a retry succeeds
+        return time.time(), None, pd.DataFrame(), f"Error fetching data: {e}"
+
+
+def fetch_inventory_data(api_url):
+    """Version and frame of api_url's data, no older than INVENTORY_TTL"""
+    confirmed_at, version, df, _ = load_inventory_data(api_url)
+    # A copy read from disk or a background request starts out partly
+    # aged, so its cache entry runs out before the cache's own TTL. A
+    # failed load has no version and is only kept for RETRY_AFTER
+    expires_after = INVENTORY_TTL if version is not None else RETRY_AFTER
+    if time.time() - confirmed_at >= expires_after:
+        load_inventory_data.clear(api_url)
+        confirmed_at, version, df, _ = load_inventory_data(api_url)
+    return version, df
+
+
+def stop_without_data(api_url):
+    """Say why api_url's data is missing and end the script run"""
+    error = load_inventory_data(api_url)[3]
+    if error:
+        st.error(error)
+    st.error("No data available. Please check the API connection.")
+    st.stop()
+
+
+# Functions to filter and aggregate the data, cached per data version and
+# filter selection; keying on the version rather than a timer of their own
+# moves every view to a refreshed snapshot together
+
+
+def filter_mask(df, filters):
+    """Rows of df matching every (column, value) filter, as a boolean array"""
+    # Combine every filter into one mask so the frame is sliced only once
+    mask = np.ones(len(df), dtype=bool)
+    for column, value in filters:
+        # Compare the integer category codes in NumPy, not labels in pandas
+        labels = df[column].array
+        if value not in labels.categories:
+            return np.zeros(len(df), dtype=bool)
+        mask &= labels.codes == labels.categories.get_loc(value)
+    return mask
+
+
+@st.cache_resource(ttl=600)
+def filter_inventory_data(api_url, version, filters):
+    """Apply the (column, value) sidebar filters to the inventory data"""
+    _, df = fetch_inventory_data(api_url)
+    mask = filter_mask(df, filters)
+    return df if mask.all() else df[mask]
+
+
+@st.cache_resource(ttl=3600)
+def inventory_labels(api_url):
+    """Distinct label combinations in the inventory data, which the sidebar
+    options are read from; kept for an hour, so refreshing the rows every
+    10 minutes does not hold up the sidebar"""
+    version, df = fetch_inventory_data(api_url)
+    if df.empty:
         return pd.DataFrame()
+    return inventory_cube(api_url, version, ()).index.to_frame(index=False)
+
+
+@st.cache_data(ttl=600)
+def filter_options(api_url, filters, column):
+    """Sorted values of column present in the data left by the filters"""
+    labels = inventory_labels(api_url)
+    values = labels[column][filter_mask(labels, filters)]
+    # Categories are already sorted; keep those still present
+    return tuple(values.cat.remove_unused_categories().cat.categories)
+
+
+def compile_numba_sum():
+    """Compile pandas' Numba groupby-sum for each count dtype on a tiny frame"""
+    # Every dtype inventory_frame can give the counts: the unsigned integers
+    # it downcasts to, int64 for negative counts and float64 for missing or
+    # fractional ones; pandas compiles the kernel separately for each
+    for dtype in (np.uint8, np.uint16, np.uint32, np.uint64, np.int64,
+                  np.float64):
+        sample = pd.DataFrame({"label": pd.Categorical(["a", "b"]),
+                               "count": np.ones(2, dtype=dtype)})
+        sample.groupby("label", observed=True)["count"].sum(
+            engine="numba", engine_kwargs=NUMBA_ENGINE_KWARGS)
+
+
+@st.cache_resource
+def numba_sum_ready():
+    """Background compilation of the Numba sum, or None without numba"""
+    if importlib.util.find_spec("numba") is None:
+        return None
+    # Compiling takes seconds, so it gets its own thread rather than
+    # holding up a cube or one of the API workers
+    return ThreadPoolExecutor(max_workers=1).submit(compile_numba_sum)
+
+
+@st.cache_data(ttl=600)
+def inventory_cube(api_url, version, filters, max_count=None):
+    """unique_ean_count of the filtered data, optionally only the rows with
+    at most max_count units, summed over all label columns"""
+    if max_count is None:
+        df = filter_inventory_data(api_url, version, filters)
+    else:
+        df = low_stock_inventory(api_url, version, filters, max_count)
+    keys = [column for column in GROUP_COLUMNS if column in df.columns]
+    # Keep missing labels here; each view drops them for its own columns
+    grouped = df.groupby(keys, observed=True, dropna=False)[
+        "unique_ean_count"]
+    # Large frames switch to the Numba kernel once it has been compiled
+    compiled = numba_sum_ready() if len(df) > NUMBA_MIN_ROWS else None
+    if compiled is not None and compiled.done() and not compiled.exception():
+        return grouped.sum(engine="numba", engine_kwargs=NUMBA_ENGINE_KWARGS)
+    return grouped.sum()
+
+
+@st.cache_data(ttl=600)
+def aggregate_inventory(api_url, version, filters, *by):
+    """Total unique_ean_count of the filtered data per group of columns"""
+    cube = inventory_cube(api_url, version, filters)
+    if len(by) > 1 or cube.index.nlevels == 1:
+        return cube.groupby(level=list(by), observed=True).sum().reset_index()
+    # One column is a weighted bincount over the cube's level codes, which
+    # follow the sorted labels, so no hash table or sort is needed
+    level = cube.index.names.index(by[0])
+    codes = cube.index.codes[level]
+    labels = cube.index.levels[level]
+    present = codes >= 0
+    sums = np.bincount(codes[present], weights=cube.to_numpy()[present],
+                       minlength=len(labels))
+    seen = np.bincount(codes[present], minlength=len(labels)) > 0
+    seen &= labels.notna()
+    # The cube keeps narrow counts while every cell fits, but the totals
+    # need not, so widen to 64 bits as a pandas sum would
+    dtype = {"u": np.uint64, "i": np.int64}.get(cube.dtype.kind, np.float64)
+    return pd.DataFrame({
+        by[0]: labels[seen],
+        "unique_ean_count": sums[seen].astype(dtype)
+    })
+
+
+@st.cache_data(ttl=600)
+def pivot_inventory(api_url, version, filters, index, columns):
+    """Heatmap matrix of unique_ean_count for the filtered data"""
+    cube = inventory_cube(api_url, version, filters)
+    return cube.groupby(level=[*index, columns], observed=True).sum().unstack(
+        columns, fill_value=0)
+
+
+@st.cache_data(ttl=600)
+def inventory_csv(api_url, version, filters, max_count=None):
+    """CSV download of the filtered data, optionally only the rows with at
+    most max_count units, written by Arrow's C++ writer"""
+    import pyarrow.csv as pa_csv
+
+    if max_count is None:
+        df = filter_inventory_data(api_url, version, filters)
+    else:
+        df = low_stock_inventory(api_url, version, filters, max_count)
+    buffer = io.BytesIO()
+    pa_csv.write_csv(pa.Table.from_pandas(df, preserve_index=False), buffer)
+    return buffer.getvalue()
+
+
+@st.cache_resource(ttl=600)
+def low_stock_inventory(api_url, version, filters, max_count):
+    """Filtered rows with at most max_count units, shared like the frame
+    they are sliced from"""
+    df = filter_inventory_data(api_url, version, filters)
+    return df[df["unique_ean_count"] <= max_count]
+
+
+@st.cache_data(ttl=600)
+def low_stock_counts(api_url, version, filters, max_count, column):
+    """Number of low stock rows per label of column, in label order"""
+    # value_counts tallies the category codes directly; it also lists
+    # categories absent from the rows, which the charts leave out
+    counts = low_stock_inventory(api_url, version, filters, max_count)[
+        column].value_counts(sort=False)
+    return counts[counts > 0].rename_axis(column).reset_index(
+        name="unique_ean_count")
+
+
+@st.cache_data(ttl=600)
+def low_stock_totals(api_url, version, filters, max_count, path):
+    """unique_ean_count of the low stock rows summed along a label path"""
+    cube = inventory_cube(api_url, version, filters, max_count)
+    totals = cube.groupby(level=list(path), observed=True).sum().reset_index()
+    # Plain labels, as plotly regroups the path without observed=True
+    totals[list(path)] = totals[list(path)].astype(object)
+    return totals
+
+
+@st.cache_data(ttl=600)
+def stock_histogram(api_url, version, filters, bins, max_count=None):
+    """Item counts per bin of unique_ean_count and the bin edges, over the
+    filtered data or only its rows with at most max_count units"""
+    if max_count is None:
+        df = filter_inventory_data(api_url, version, filters)
+    else:
+        df = low_stock_inventory(api_url, version, filters, max_count)
+    # Items with a missing count are left out, as px.histogram did
+    return np.histogram(df["unique_ean_count"].dropna(), bins=bins)
+
+
+@st.cache_data(ttl=600)
+def summary_statistics(api_url, version, filters):
+    """DataFrame.describe() table of the numeric columns of the filtered data"""
+    df = filter_inventory_data(api_url, version, filters).select_dtypes(
+        "number")
+    stats = {}
+    for column in df.columns:
+        values = df[column].dropna().to_numpy(dtype=float)
+        if values.size:
+            # np.quantile selects by partitioning, one pass per quartile
+            quartiles = np.quantile(values, [0.25, 0.5, 0.75])
+            spread = values.std(ddof=1) if values.size > 1 else np.nan
+            stats[column] = [values.size, values.mean(), spread,
+                             values.min(), *quartiles, values.max()]
+        else:
+            stats[column] = [0] + [np.nan] * 7
+    return pd.DataFrame(
+        stats, index=["count", "mean", "std", "min", "25%", "50%", "75%", "max"])
 
 
+# Functions to build charts straight from the aggregated frames; figures are
+# shared as-is between reruns and rebuilt only when their input data changes,
+# so callers must not modify them
+
+
+@st.cache_resource(ttl=600)
+def bar_chart(data, x, title, labels, color=None):
+    """Bar chart of unique_ean_count per x, with one trace per color value"""
+    import plotly.graph_objects as go
+
+    if color is None:
+        traces = [go.Bar(x=data[x].to_numpy(),
+                         y=data["unique_ean_count"].to_numpy())]
+    else:
+        traces = [
+            go.Bar(name=str(name), x=group[x].to_numpy(),
+                   y=group["unique_ean_count"].to_numpy())
+            for name, group in data.groupby(color, observed=True, sort=False)
+        ]
+    fig = go.Figure(traces)
+    fig.update_layout(
+        title=title,
+        barmode="relative",
+        showlegend=color is not None,
+        legend_title_text=labels.get(color),
+        xaxis_title=labels[x],
+        yaxis_title=labels["unique_ean_count"]
+    )
+    return fig
+
+
+@st.cache_resource(ttl=600)
+def pie_chart(data, names, title):
+    """Donut chart of the unique_ean_count share of each names value"""
+    import plotly.graph_objects as go
+
+    fig = go.Figure(go.Pie(
+        labels=data[names].to_numpy(),
+        values=data["unique_ean_count"].to_numpy(),
+        hole=0.4,
+        textposition="inside",
+        textinfo="percent+label"
+    ))
+    fig.update_layout(title=title)
+    return fig
+
+
+@st.cache_resource(ttl=600)
+def histogram_chart(counts, edges, title, labels):
+    """Histogram of stock counts from stock_histogram's bins, so only the
+    bars are sent"""
+    import plotly.graph_objects as go
+
+    fig = go.Figure(go.Bar(
+        x=(edges[:-1] + edges[1:]) / 2,
+        y=counts,
+        width=np.diff(edges)
+    ))
+    fig.update_layout(
+        title=title,
+        bargap=0,
+        xaxis_title=labels["unique_ean_count"],
+        yaxis_title=labels["count"]
+    )
+    return fig
+
+
+@st.cache_resource(ttl=600)
+def heatmap_chart(data, labels):
+    """Heatmap of a pivoted unique_ean_count matrix, first row on top"""
+    import plotly.graph_objects as go
+
+    rows = [" | ".join(map(str, key)) if isinstance(key, tuple) else str(key)
+            for key in data.index]
+    # Cell labels are SVG text nodes; past a few hundred they cost more to
+    # draw than the heatmap itself, so large matrices rely on hover instead.
+    # Counts fit in 32 bits, which halves the binary-encoded z array;
+    # fractional counts are sent as float32 so they are not truncated
+    integer = all(dtype.kind in "iu" for dtype in data.dtypes)
+    fig = go.Figure(go.Heatmap(
+        z=data.to_numpy(dtype=np.int32 if integer else np.float32),
+        x=data.columns.astype(str).to_numpy(),
+        y=rows,
+        texttemplate="%{z}" if data.size <= HEATMAP_TEXT_CELLS else None,
+        colorscale="Viridis",
+        colorbar_title_text=labels["color"]
+    ))
+    fig.update_layout(
+        xaxis_title=labels["x"],
+        yaxis_title=labels["y"],
+        yaxis_autorange="reversed",
+        height=400
+    )
+    return fig
+
+
+# Start loading every category while the page is drawn, the last selected
+# one first, so switching categories does not wait for the API
+last_category = st.session_state.get(
+    "selected_category", next(iter(API_ENDPOINTS)))
+for category in sorted(API_ENDPOINTS, key=lambda name: name != last_category):
+    prefetch_inventory_data(API_ENDPOINTS[category])
+
 # Product category selector
 st.sidebar.header("Product Category")
 selected_category = st.sidebar.radio(
-    "Select Product", list(API_ENDPOINTS.keys()))
+    "Select Product", list(API_ENDPOINTS.keys()), key="selected_category")
 
 # Load and process data for the selected category
+api_url = API_ENDPOINTS[selected_category]
 with st.spinner(f"Fetching {selected_category} inventory data..."):
-    df = fetch_inventory_data(API_ENDPOINTS[selected_category])
+    labels = inventory_labels(api_url)
 
 # Check if data was loaded successfully
-if df.empty:
-    st.error("No data available. Please check the API connection.")
-    st.stop()
+if labels.empty:
+    # Rebuild the labels on a later rerun instead of keeping the failure for
+    # an hour; the download itself is retried after RETRY_AFTER seconds
+    inventory_labels.clear(api_url)
+    stop_without_data(api_url)
+
+
+def sidebar_filter(api_url, filters, column, label):
+    """Selectbox of column's values left by the filters chosen so far; a
+    choice other than "All" is appended to filters"""
+    if column not in inventory_labels(api_url).columns:
+        return
+    options = ("All", *filter_options(api_url, tuple(filters), column))
+    selected = st.sidebar.selectbox(label, options)
+    if selected != "All":
+        filters.append((column, selected))
 
-# Convert unique_ean_count to numeric
-df["unique_ean_count"] = pd.to_numeric(df["unique_ean_count"])
 
 # Create sidebar filters based on the selected product category
 st.sidebar.header("Filters")
 
+# Selected (column, value) pairs; each filter's options come from the data
+# narrowed by the filters above it, cached per selection
+filters = []
+
 # Common filters for all product types
-# Collection filter
-if "collection" in df.columns:
-    all_collections = ["All"] + sorted(df["collection"].unique().tolist())
-    selected_collection = st.sidebar.selectbox(
-        "Select Collection", all_collections)
-    if selected_collection != "All":
-        df = df[df["collection"] == selected_collection]
-
-# Fit filter
-if "fit" in df.columns:
-    all_fits = ["All"] + sorted(df["fit"].unique().tolist())
-    selected_fit = st.sidebar.selectbox("Select Fit", all_fits)
-    if selected_fit != "All":
-        df = df[df["fit"] == selected_fit]
+sidebar_filter(api_url, filters, "collection", "Select Collection")
+sidebar_filter(api_url, filters, "fit", "Select Fit")
 
 # Product-specific filters
 if selected_category == "Jeans":
-    # Gender filter for jeans
-    if "gender" in df.columns:
-        all_genders = ["All"] + sorted(df["gender"].unique().tolist())
-        selected_gender = st.sidebar.selectbox("Select Gender", all_genders)
-        if selected_gender != "All":
-            df = df[df["gender"] == selected_gender]
-
-    # Waist size filter for jeans
-    if "un_waist" in df.columns:
-        all_waists = [
-            "All"] + sorted([str(w) for w in df["un_waist"].unique() if pd.notna(w)])
-        selected_waist = st.sidebar.selectbox("Select Waist Size", all_waists)
-        if selected_waist != "All":
-            df = df[df["un_waist"].astype(str) == selected_waist]
+    sidebar_filter(api_url, filters, "gender", "Select Gender")
+    sidebar_filter(api_url, filters, "un_waist", "Select Waist Size")
 
 elif selected_category == "Jackets":
-    # Gender filter for jackets
-    if "gender" in df.columns:
-        all_genders = ["All"] + sorted(df["gender"].unique().tolist())
-        selected_gender = st.sidebar.selectbox("Select Gender", all_genders)
-        if selected_gender != "All":
-            df = df[df["gender"] == selected_gender]
-
-    # Size filter for jackets
-    if "un_size" in df.columns:
-        all_sizes = ["All"] + sorted([str(s)
-                                     for s in df["un_size"].unique() if pd.notna(s)])
-        selected_size = st.sidebar.selectbox("Select Size", all_sizes)
-        if selected_size != "All":
-            df = df[df["un_size"].astype(str) == selected_size]
-
-    # Color filter for jackets
-    if "color" in df.columns:
-        all_colors = ["All"] + sorted(df["color"].unique().tolist())
-        selected_color = st.sidebar.selectbox("Select Color", all_colors)
-        if selected_color != "All":
-            df = df[df["color"] == selected_color]
+    sidebar_filter(api_url, filters, "gender", "Select Gender")
+    sidebar_filter(api_url, filters, "un_size", "Select Size")
+    sidebar_filter(api_url, filters, "color", "Select Color")
 
 elif selected_category == "Kimono & Gilet":
-    # Size filter for kimono/gilet
-    if "un_size" in df.columns:
-        all_sizes = ["All"] + sorted([str(s)
-                                     for s in df["un_size"].unique() if pd.notna(s)])
-        selected_size = st.sidebar.selectbox("Select Size", all_sizes)
-        if selected_size != "All":
-            df = df[df["un_size"].astype(str) == selected_size]
+    sidebar_filter(api_url, filters, "un_size", "Select Size")
 
-# Store filtered dataframe for use in tabs
-filtered_df = df.copy()
+# Load the rows only now, so the sidebar is already drawn if they need to
+# be downloaded again
+with st.spinner(f"Fetching {selected_category} inventory data..."):
+    version, df = fetch_inventory_data(api_url)
+if df.empty:
+    stop_without_data(api_url)
+
+# Filtered dataframe for use in tabs, served from cache for repeat selections
+filters = tuple(filters)
+filtered_df = filter_inventory_data(api_url, version, filters)
 
-# Create dashboard tabs
-tab1, tab2, tab3, tab4 = st.tabs(
-    ["📈 Overview", "🧵 Detailed Analysis", "📋 Raw Data", "⚠️ Low Stock"])
+# The labels can be older than the rows, so a selection may no longer match
+if filtered_df.empty:
+    st.warning("No inventory matches the selected filters.")
+    st.stop()
 
 # Overview Tab
-with tab1:
+
+
+def overview_tab(selected_category, api_url, version, filters,
+                 filtered_df):
+    """Top metrics and the main inventory charts"""
+    import plotly.graph_objects as go
+
     # Top metrics row
     col1, col2, col3 = st.columns(3)
 
@@ -198,12 +698,11 @@ with tab1:
         if selected_category == "Jeans":
             if "gender" in filtered_df.columns and "fit" in filtered_df.columns:
                 st.subheader("Inventory by Gender and Fit")
-                gender_fit_df = filtered_df.groupby(["gender", "fit"])[
-                    "unique_ean_count"].sum().reset_index()
-                fig = px.bar(
+                gender_fit_df = aggregate_inventory(
+                    api_url, version, filters, "gender", "fit")
+                fig = bar_chart(
                     gender_fit_df,
                     x="gender",
-                    y="unique_ean_count",
                     color="fit",
                     title="Inventory Count by Gender and Fit",
                     labels={"unique_ean_count": "Item Count",
@@ -212,12 +711,10 @@ with tab1:
                 st.plotly_chart(fig, use_container_width=True)
             else:
                 st.subheader("Inventory by Fit")
-                fit_df = filtered_df.groupby(
-                    "fit")["unique_ean_count"].sum().reset_index()
-                fig = px.bar(
+                fit_df = aggregate_inventory(api_url, version, filters, "fit")
+                fig = bar_chart(
                     fit_df,
                     x="fit",
-                    y="unique_ean_count",
                     color="fit",
                     title="Inventory Count by Fit",
                     labels={"unique_ean_count": "Item Count",
@@ -228,14 +725,13 @@ with tab1:
         elif selected_category == "Jackets":
             if "color" in filtered_df.columns:
                 st.subheader("Inventory by Color")
-                color_df = filtered_df.groupby(
-                    "color")["unique_ean_count"].sum().reset_index()
+                color_df = aggregate_inventory(
+                    api_url, version, filters, "color")
                 color_df = color_df.sort_values(
                     by="unique_ean_count", ascending=False)
-                fig = px.bar(
+                fig = bar_chart(
                     color_df,
                     x="color",
-                    y="unique_ean_count",
                     color="color",
                     title="Inventory by Color",
                     labels={"unique_ean_count": "Item Count", "color": "Color"}
@@ -243,12 +739,10 @@ with tab1:
                 st.plotly_chart(fig, use_container_width=True)
             else:
                 st.subheader("Inventory by Fit")
-                fit_df = filtered_df.groupby(
-                    "fit")["unique_ean_count"].sum().reset_index()
-                fig = px.bar(
+                fit_df = aggregate_inventory(api_url, version, filters, "fit")
+                fig = bar_chart(
                     fit_df,
                     x="fit",
-                    y="unique_ean_count",
                     color="fit",
                     title="Inventory Count by Fit",
                     labels={"unique_ean_count": "Item Count",
@@ -258,12 +752,10 @@ with tab1:
 
         elif selected_category == "Kimono & Gilet":
             st.subheader("Inventory by Fit")
-            fit_df = filtered_df.groupby(
-                "fit")["unique_ean_count"].sum().reset_index()
-            fig = px.bar(
+            fit_df = aggregate_inventory(api_url, version, filters, "fit")
+            fig = bar_chart(
                 fit_df,
                 x="fit",
-                y="unique_ean_count",
                 color="fit",
                 title="Inventory Count by Fit",
                 labels={"unique_ean_count": "Item Count", "fit": "Fit Style"}
@@ -274,29 +766,22 @@ with tab1:
     with col2:
         if "collection" in filtered_df.columns:
             st.subheader("Inventory by Collection")
-            collection_df = filtered_df.groupby(
-                "collection")["unique_ean_count"].sum().reset_index()
-            fig = px.pie(
+            collection_df = aggregate_inventory(
+                api_url, version, filters, "collection")
+            fig = pie_chart(
                 collection_df,
-                values="unique_ean_count",
                 names="collection",
-                title="Inventory Distribution by Collection",
-                hole=0.4
+                title="Inventory Distribution by Collection"
             )
-            fig.update_traces(textposition='inside', textinfo='percent+label')
             st.plotly_chart(fig, use_container_width=True)
         elif "un_size" in filtered_df.columns:
             st.subheader("Inventory by Size")
-            size_df = filtered_df.groupby(
-                "un_size")["unique_ean_count"].sum().reset_index()
-            fig = px.pie(
+            size_df = aggregate_inventory(api_url, version, filters, "un_size")
+            fig = pie_chart(
                 size_df,
-                values="unique_ean_count",
                 names="un_size",
-                title="Inventory Distribution by Size",
-                hole=0.4
+                title="Inventory Distribution by Size"
             )
-            fig.update_traces(textposition='inside', textinfo='percent+label')
             st.plotly_chart(fig, use_container_width=True)
         else:
             st.subheader("Overall Inventory")
@@ -309,21 +794,26 @@ with tab1:
             ))
             st.plotly_chart(fig, use_container_width=True)
 
+
 # Detailed Analysis Tab
-with tab2:
+
+
+def detailed_analysis_tab(selected_category, api_url, version, filters,
+                          filtered_df):
+    """Size and fit distributions plus the category heatmap"""
+    import plotly.graph_objects as go
+
     col1, col2 = st.columns(2)
 
     # First detailed chart - Size distribution (waist for jeans, size for others)
     with col1:
         if "un_waist" in filtered_df.columns:
             st.subheader("Waist Size Distribution")
-            waist_df = filtered_df.groupby(
-                "un_waist")["unique_ean_count"].sum().reset_index()
-            waist_df = waist_df.sort_values(by="un_waist")
-            fig = px.bar(
+            waist_df = aggregate_inventory(
+                api_url, version, filters, "un_waist")
+            fig = bar_chart(
                 waist_df,
                 x="un_waist",
-                y="unique_ean_count",
                 title="Inventory by Waist Size",
                 labels={"unique_ean_count": "Item Count",
                         "un_waist": "Waist Size"}
@@ -331,13 +821,10 @@ with tab2:
             st.plotly_chart(fig, use_container_width=True)
         elif "un_size" in filtered_df.columns:
             st.subheader("Size Distribution")
-            size_df = filtered_df.groupby(
-                "un_size")["unique_ean_count"].sum().reset_index()
-            size_df = size_df.sort_values(by="un_size")
-            fig = px.bar(
+            size_df = aggregate_inventory(api_url, version, filters, "un_size")
+            fig = bar_chart(
                 size_df,
                 x="un_size",
-                y="unique_ean_count",
                 title="Inventory by Size",
                 labels={"unique_ean_count": "Item Count", "un_size": "Size"}
             )
@@ -358,13 +845,11 @@ with tab2:
     with col2:
         if "fit" in filtered_df.columns:
             st.subheader("Fit Style Popularity")
-            fit_df = filtered_df.groupby(
-                "fit")["unique_ean_count"].sum().reset_index()
+            fit_df = aggregate_inventory(api_url, version, filters, "fit")
             fit_df = fit_df.sort_values(by="unique_ean_count", ascending=False)
-            fig = px.bar(
+            fig = bar_chart(
                 fit_df,
                 x="fit",
-                y="unique_ean_count",
                 title="Inventory by Fit Style",
                 labels={"unique_ean_count": "Item Count", "fit": "Fit Style"},
                 color="fit"
@@ -372,14 +857,12 @@ with tab2:
             st.plotly_chart(fig, use_container_width=True)
         elif "color" in filtered_df.columns:
             st.subheader("Color Popularity")
-            color_df = filtered_df.groupby(
-                "color")["unique_ean_count"].sum().reset_index()
+            color_df = aggregate_inventory(api_url, version, filters, "color")
             color_df = color_df.sort_values(
                 by="unique_ean_count", ascending=False)
-            fig = px.bar(
+            fig = bar_chart(
                 color_df,
                 x="color",
-                y="unique_ean_count",
                 title="Inventory by Color",
                 labels={"unique_ean_count": "Item Count", "color": "Color"},
                 color="color"
@@ -387,10 +870,8 @@ with tab2:
             st.plotly_chart(fig, use_container_width=True)
         else:
             st.subheader("Stock Distribution")
-            fig = px.histogram(
-                filtered_df,
-                x="unique_ean_count",
-                nbins=20,
+            fig = histogram_chart(
+                *stock_histogram(api_url, version, filters, 20),
                 title="Distribution of Stock Counts",
                 labels={"unique_ean_count": "Stock Count",
                         "count": "Number of Items"}
@@ -401,23 +882,14 @@ with tab2:
     if selected_category == "Jeans" and "gender" in filtered_df.columns and "collection" in filtered_df.columns and "fit" in filtered_df.columns:
         st.subheader("Inventory Heatmap: Gender × Collection × Fit")
         try:
-            heatmap_df = filtered_df.pivot_table(
-                index=["gender", "collection"],
-                columns="fit",
-                values="unique_ean_count",
-                aggfunc="sum",
-                fill_value=0
-            )
+            heatmap_df = pivot_inventory(
+                api_url, version, filters, index=("gender", "collection"), columns="fit")
 
-            fig = px.imshow(
+            fig = heatmap_chart(
                 heatmap_df,
                 labels=dict(x="Fit Style", y="Gender & Collection",
-                            color="Item Count"),
-                text_auto=True,
-                aspect="auto",
-                color_continuous_scale="Viridis"
+                            color="Item Count")
             )
-            fig.update_layout(height=400)
             st.plotly_chart(fig, use_container_width=True)
         except Exception as e:
             st.warning(f"Could not create heatmap: {e}")
@@ -425,22 +897,13 @@ with tab2:
     elif selected_category == "Jackets" and "color" in filtered_df.columns and "fit" in filtered_df.columns:
         st.subheader("Inventory Heatmap: Color × Fit")
         try:
-            heatmap_df = filtered_df.pivot_table(
-                index="color",
-                columns="fit",
-                values="unique_ean_count",
-                aggfunc="sum",
-                fill_value=0
-            )
+            heatmap_df = pivot_inventory(
+                api_url, version, filters, index=("color",), columns="fit")
 
-            fig = px.imshow(
+            fig = heatmap_chart(
                 heatmap_df,
-                labels=dict(x="Fit Style", y="Color", color="Item Count"),
-                text_auto=True,
-                aspect="auto",
-                color_continuous_scale="Viridis"
+                labels=dict(x="Fit Style", y="Color", color="Item Count")
             )
-            fig.update_layout(height=400)
             st.plotly_chart(fig, use_container_width=True)
         except Exception as e:
             st.warning(f"Could not create heatmap: {e}")
@@ -448,32 +911,29 @@ with tab2:
     elif selected_category == "Kimono & Gilet" and "un_size" in filtered_df.columns and "fit" in filtered_df.columns:
         st.subheader("Inventory Heatmap: Size × Fit")
         try:
-            heatmap_df = filtered_df.pivot_table(
-                index="un_size",
-                columns="fit",
-                values="unique_ean_count",
-                aggfunc="sum",
-                fill_value=0
-            )
+            heatmap_df = pivot_inventory(
+                api_url, version, filters, index=("un_size",), columns="fit")
 
-            fig = px.imshow(
+            fig = heatmap_chart(
                 heatmap_df,
-                labels=dict(x="Fit Style", y="Size", color="Item Count"),
-                text_auto=True,
-                aspect="auto",
-                color_continuous_scale="Viridis"
+                labels=dict(x="Fit Style", y="Size", color="Item Count")
             )
-            fig.update_layout(height=400)
             st.plotly_chart(fig, use_container_width=True)
         except Exception as e:
             st.warning(f"Could not create heatmap: {e}")
 
+
 # Raw Data Tab
-with tab3:
+
+
+def raw_data_tab(selected_category, api_url, version, filters,
+                 filtered_df):
+    """Filtered rows with a CSV download and summary statistics"""
     st.subheader(f"Raw {selected_category} Inventory Data")
 
-    # Download button for CSV
-    csv = filtered_df.to_csv(index=False).encode('utf-8')
+    # Download button for CSV, serialized once per data version and filter
+    # selection
+    csv = inventory_csv(api_url, version, filters)
     st.download_button(
         label="Download data as CSV",
         data=csv,
@@ -481,23 +941,57 @@ with tab3:
         mime="text/csv",
     )
 
-    # Show dataframe
-    st.dataframe(filtered_df, use_container_width=True)
+    # Show dataframe a page at a time; the CSV above has every row. Pages
+    # are counted per selection, so a new category or filter starts again
+    # from one page
+    selection = (api_url, filters)
+    paged_selection, shown_rows = st.session_state.get(
+        "raw_data_rows", (None, None))
+    if paged_selection != selection:
+        shown_rows = RAW_DATA_PAGE_ROWS
+    st.dataframe(filtered_df.head(shown_rows), hide_index=True,
+                 use_container_width=True)
+    if len(filtered_df) > shown_rows:
+        st.caption(f"Showing {shown_rows:,} of {len(filtered_df):,} rows.")
+        st.button("Show more rows", on_click=show_more_rows,
+                  args=(selection, shown_rows))
 
     # Summary statistics
-    if st.checkbox("Show Summary Statistics"):
-        st.write(filtered_df.describe())
+    summary_statistics_toggle(api_url, version, filters)
+
+
+def show_more_rows(selection, shown_rows):
+    """Button callback that adds another page to the raw data table"""
+    st.session_state["raw_data_rows"] = (
+        selection, shown_rows + RAW_DATA_PAGE_ROWS)
+
+
+@st.fragment
+def summary_statistics_toggle(api_url, version, filters):
+    """Checkbox that reruns only itself, leaving the table above untouched"""
+    if st.checkbox("Show Summary Statistics", key="show_summary_statistics"):
+        st.write(summary_statistics(api_url, version, filters))
+
 
 # Low Stock Tab
-with tab4:
+
+
+@st.fragment
+def low_stock_tab(selected_category, api_url, version, filters, filtered_df):
+    """Charts and tables for items at or below a stock threshold; moving
+    the slider reruns only this tab, not the sidebar and data loading"""
+    import plotly.express as px
+    import plotly.graph_objects as go
+
     st.subheader(f"Low Stock {selected_category} Analysis")
 
     # Let user define what "low stock" means
-    low_stock_threshold = st.slider("Low Stock Threshold", 1, 30, 10)
+    low_stock_threshold = st.slider(
+        "Low Stock Threshold", 1, 30, key="low_stock_threshold")
 
-    # Filter for low stock items
-    low_stock_df = filtered_df[filtered_df["unique_ean_count"]
-                               <= low_stock_threshold].copy()
+    # Filter for low stock items, cached per filter selection and threshold
+    low_stock_df = low_stock_inventory(
+        api_url, version, filters, low_stock_threshold)
 
     if low_stock_df.empty:
         st.info(
@@ -513,14 +1007,13 @@ with tab4:
             # Low stock distribution chart
             if "fit" in low_stock_df.columns:
                 st.subheader("Low Stock by Fit Style")
-                low_fit_df = low_stock_df.groupby(
-                    "fit")["unique_ean_count"].count().reset_index()
+                low_fit_df = low_stock_counts(
+                    api_url, version, filters, low_stock_threshold, "fit")
                 low_fit_df = low_fit_df.sort_values(
                     by="unique_ean_count", ascending=False)
-                fig = px.bar(
+                fig = bar_chart(
                     low_fit_df,
                     x="fit",
-                    y="unique_ean_count",
                     color="fit",
                     title=f"Low Stock Items by Fit Style (≤ {low_stock_threshold} units)",
                     labels={
@@ -529,14 +1022,13 @@ with tab4:
                 st.plotly_chart(fig, use_container_width=True)
             elif "color" in low_stock_df.columns:
                 st.subheader("Low Stock by Color")
-                low_color_df = low_stock_df.groupby(
-                    "color")["unique_ean_count"].count().reset_index()
+                low_color_df = low_stock_counts(
+                    api_url, version, filters, low_stock_threshold, "color")
                 low_color_df = low_color_df.sort_values(
                     by="unique_ean_count", ascending=False)
-                fig = px.bar(
+                fig = bar_chart(
                     low_color_df,
                     x="color",
-                    y="unique_ean_count",
                     color="color",
                     title=f"Low Stock Items by Color (≤ {low_stock_threshold} units)",
                     labels={
@@ -545,10 +1037,9 @@ with tab4:
                 st.plotly_chart(fig, use_container_width=True)
             else:
                 st.subheader("Low Stock Distribution")
-                fig = px.histogram(
-                    low_stock_df,
-                    x="unique_ean_count",
-                    nbins=low_stock_threshold,
+                fig = histogram_chart(
+                    *stock_histogram(api_url, version, filters,
+                                     low_stock_threshold, low_stock_threshold),
                     title=f"Distribution of Low Stock Counts (≤ {low_stock_threshold} units)",
                     labels={"unique_ean_count": "Stock Count",
                             "count": "Number of Items"}
@@ -559,33 +1050,26 @@ with tab4:
             # Second low stock chart
             if "collection" in low_stock_df.columns:
                 st.subheader("Low Stock by Collection")
-                low_collection_df = low_stock_df.groupby(
-                    "collection")["unique_ean_count"].count().reset_index()
-                fig = px.pie(
+                low_collection_df = low_stock_counts(
+                    api_url, version, filters, low_stock_threshold,
+                    "collection")
+                fig = pie_chart(
                     low_collection_df,
-                    values="unique_ean_count",
                     names="collection",
-                    title=f"Low Stock Items by Collection (≤ {low_stock_threshold} units)",
-                    hole=0.4
+                    title=f"Low Stock Items by Collection (≤ {low_stock_threshold} units)"
                 )
-                fig.update_traces(textposition='inside',
-                                  textinfo='percent+label')
                 st.plotly_chart(fig, use_container_width=True)
             elif "un_size" in low_stock_df.columns or "un_waist" in low_stock_df.columns:
                 size_col = "un_size" if "un_size" in low_stock_df.columns else "un_waist"
                 size_label = "Size" if size_col == "un_size" else "Waist Size"
                 st.subheader(f"Low Stock by {size_label}")
-                low_size_df = low_stock_df.groupby(
-                    size_col)["unique_ean_count"].count().reset_index()
-                fig = px.pie(
+                low_size_df = low_stock_counts(
+                    api_url, version, filters, low_stock_threshold, size_col)
+                fig = pie_chart(
                     low_size_df,
-                    values="unique_ean_count",
                     names=size_col,
-                    title=f"Low Stock Items by {size_label} (≤ {low_stock_threshold} units)",
-                    hole=0.4
+                    title=f"Low Stock Items by {size_label} (≤ {low_stock_threshold} units)"
                 )
-                fig.update_traces(textposition='inside',
-                                  textinfo='percent+label')
                 st.plotly_chart(fig, use_container_width=True)
             else:
                 st.subheader("Low Stock Summary")
@@ -631,8 +1115,9 @@ with tab4:
         # Only proceed if we have columns to create hierarchy
         if treemap_path:
             # Group data according to the path
-            treemap_data = low_stock_df.groupby(
-                treemap_path)['unique_ean_count'].sum().reset_index()
+            treemap_data = low_stock_totals(
+                api_url, version, filters, low_stock_threshold,
+                tuple(treemap_path))
 
             fig = px.treemap(
                 treemap_data,
@@ -649,12 +1134,10 @@ with tab4:
         # Create a sunburst chart for hierarchical view
         st.subheader("Low Stock Hierarchy (Sunburst)")
 
-        # Use the same path as treemap
+        # Use the same path and frame as the treemap
         if treemap_path:
-            sunburst_data = low_stock_df.groupby(
-                treemap_path)['unique_ean_count'].sum().reset_index()
             fig = px.sunburst(
-                sunburst_data,
+                treemap_data,
                 path=treemap_path,
                 values='unique_ean_count',
                 color='unique_ean_count',
@@ -684,7 +1167,7 @@ with tab4:
             # Only proceed if we have at least 3 dimensions (2 categorical + stock count)
             if len(parcoords_cols) >= 3:
                 # Prepare data for parallel coordinates
-                parallel_data = low_stock_df[parcoords_cols].copy()
+                parallel_data = low_stock_df[parcoords_cols]
 
                 # Create dimensions list for the plot
                 dimensions = []
@@ -692,9 +1175,9 @@ with tab4:
                 # Add categorical dimensions
                 for col in parcoords_cols:
                     if col != 'unique_ean_count':
-                        # Map categorical values to numeric indices
-                        unique_vals = parallel_data[col].unique()
-                        val_map = {val: idx for idx, val in enumerate(unique_vals)}
+                        # Number the labels in order of appearance straight
+                        # from the category codes; missing labels stay unset
+                        codes, unique_vals = pd.factorize(parallel_data[col])
 
                         dimensions.append(
                             dict(
@@ -702,7 +1185,7 @@ with tab4:
                                 tickvals=list(range(len(unique_vals))),
                                 ticktext=unique_vals,
                                 label=col,
-                                values=parallel_data[col].map(val_map)
+                                values=np.where(codes >= 0, codes, np.nan)
                             )
                         )
 
@@ -743,10 +1226,11 @@ with tab4:
         # Detailed low stock table
         st.subheader("Detailed Low Stock Items")
         st.dataframe(low_stock_df.sort_values(
-            "unique_ean_count"), use_container_width=True)
+            "unique_ean_count"), hide_index=True, use_container_width=True)
 
-        # Download low stock data
-        csv = low_stock_df.to_csv(index=False).encode('utf-8')
+        # Download low stock data, serialized once per data version, filter
+        # and threshold
+        csv = inventory_csv(api_url, version, filters, low_stock_threshold)
         st.download_button(
             label="Download low stock data as CSV",
             data=csv,
@@ -754,6 +1238,26 @@ with tab4:
             mime="text/csv",
         )
 
+
+# Widgets in hidden tabs are not drawn, so carry their values over
+# explicitly; Streamlit would otherwise reset them to the defaults
+for key, default in (("low_stock_threshold", 10),
+                     ("show_summary_statistics", False)):
+    st.session_state[key] = st.session_state.get(key, default)
+
+# Create dashboard tabs; Streamlit tracks the open tab and reruns on a
+# switch, so only the visible tab's figures are built
+tabs = st.tabs(
+    ["📈 Overview", "🧵 Detailed Analysis", "📋 Raw Data", "⚠️ Low Stock"],
+    key="dashboard_tab", on_change="rerun")
+tab_builders = (overview_tab, detailed_analysis_tab, raw_data_tab,
+                low_stock_tab)
+for tab, build_tab in zip(tabs, tab_builders):
+    if tab.open:
+        with tab:
+            build_tab(selected_category, api_url, version, filters,
+                      filtered_df)
+
 # Footer
 st.markdown("---")
 st.markdown("*Data provided by UNIQ Inventory API*")